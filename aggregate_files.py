@@ -4,27 +4,409 @@
 import os
 import sys
 import argparse
+import asyncio
+import codecs
+import functools
+import io
 import time
 import re
 from pathlib import Path
-from urllib.parse import urlparse, urljoin
+from urllib.parse import (parse_qsl, urlencode, urljoin, urlparse,
+                          urlsplit, urlunsplit)
 from typing import List, Set, Optional, Tuple
 import threading
 from datetime import datetime, timedelta
 import multiprocessing
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, as_completed, wait)
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
-import pdfplumber
+
+try:
+    import aiohttp
+except ImportError:
+    # aiohttpが無い環境では同期クローラーにフォールバック
+    aiohttp = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    # selectolaxが無い環境ではBeautifulSoupにフォールバック
+    LexborHTMLParser = None
+
+# BeautifulSoupのバックエンドは、あればC実装のlxmlを使う
+# （純Pythonのhtml.parserは大きなページで数倍遅い）
+try:
+    import lxml  # noqa: F401
+    _BS4_PARSER = 'lxml'
+except ImportError:
+    _BS4_PARSER = 'html.parser'
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    # pypdfium2が無い環境ではpdfplumberにフォールバック
+    pdfium = None
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
 import openpyxl
 import docx
 
+# そのままコードブロックに取り込むテキストファイルの拡張子
+# （リストだと線形探索になるためfrozensetでO(1)判定にする）
+_TEXT_EXTS = frozenset({
+    '.txt', '.md', '.py', '.js', '.html', '.css', '.json',
+    '.xml', '.yaml', '.yml', '.csv', '.sql'
+})
+
+# 拡張子→コードフェンスの言語タグ（ファイル毎のスライス・分岐を避けるため
+# モジュール読み込み時に1回だけ構築する）
+_LANGUAGE_MAP = {ext: ext[1:] for ext in _TEXT_EXTS}
+
+
+# 実際に現れる拡張子は数十種類程度なので、C実装のハッシュ参照1回で
+# 返せるようキャッシュしておく
+@functools.lru_cache(maxsize=256)
+def _fence_language(ext: str) -> str:
+    """コードフェンスに付ける言語タグを返す"""
+    return _LANGUAGE_MAP.get(ext, 'text')
+
+# CPUバウンドな抽出処理（pdfplumberのページ解析、非同期クロール中の
+# バイナリ抽出）を逃がす共有プール（初回利用時に生成）
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+_cpu_pool_lock = threading.Lock()
+# これ未満のページ数ではプール投入コストの方が高い
+_PAGE_POOL_MIN_PAGES = 4
+
+
+def _get_cpu_pool() -> ProcessPoolExecutor:
+    # 複数スレッドから同時に呼ばれるため、チェックと生成をロックで
+    # 直列化する（二重チェックで取得済みの場合はロックを取らない）
+    global _cpu_pool
+    if _cpu_pool is None:
+        with _cpu_pool_lock:
+            if _cpu_pool is None:
+                _cpu_pool = ProcessPoolExecutor(
+                    max_workers=min(multiprocessing.cpu_count(), 8))
+    return _cpu_pool
+
+
+def _extract_pdf_page(path: str, page_index: int) -> str:
+    """ワーカープロセスで1ページ分のテキストを抽出する"""
+    with pdfplumber.open(path) as pdf:
+        return pdf.pages[page_index].extract_text() or ""
+
+
+# 走査自体を丸ごと省略するディレクトリ名（正規表現より速い完全一致判定用）
+_SKIP_DIR_NAMES = frozenset({'bin', 'obj', '.git', '.vs', '__pycache__', 'node_modules'})
+
+# 相対URL→絶対URLの結合もキャッシュする（同じhrefが何度も現れるため）
+_urljoin = functools.lru_cache(maxsize=4096)(urljoin)
+
+# コンテンツを変えない追跡用クエリパラメータ（訪問済み判定から除外する）
+_TRACKING_PARAMS = frozenset({'fbclid', 'gclid'})
+
+
+@functools.lru_cache(maxsize=4096)
+def _canonicalize_url(url: str) -> str:
+    """URLを訪問済み判定用の正規形に変換する
+
+    スキームとホストを小文字化し、デフォルトポート・フラグメント・
+    追跡用パラメータ（utm_*等）を取り除き、クエリをソートする。
+    末尾スラッシュやパラメータ順序だけが違うURLの再クロールを防ぐ。
+    """
+    parsed = urlsplit(url)
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if ((scheme == 'http' and netloc.endswith(':80'))
+            or (scheme == 'https' and netloc.endswith(':443'))):
+        netloc = netloc.rsplit(':', 1)[0]
+    query = ''
+    if parsed.query:
+        pairs = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+                 if not (k.startswith('utm_') or k in _TRACKING_PARAMS)]
+        query = urlencode(sorted(pairs))
+    return urlunsplit((scheme, netloc, parsed.path or '/', query, ''))
+
+# os.sendfileによるカーネル内コピーが使える環境か
+_HAS_SENDFILE = hasattr(os, 'sendfile') and os.name == 'posix'
+# これ以上のサイズのテキストファイルはPython側に読み込まず直接転送する
+_SENDFILE_MIN_SIZE = 1024 * 1024
+
+
+def _mostly_utf8(head: bytes) -> bool:
+    """先頭サンプルがUTF-8として成立しているか判定する"""
+    try:
+        head.decode('utf-8')
+        return True
+    except UnicodeDecodeError as e:
+        # サンプル末尾でマルチバイト文字が切れているだけなら許容
+        return e.start >= len(head) - 4
+
+
+def _file_is_utf8(f) -> bool:
+    """ファイル全体がUTF-8として正しいか、逐次デコードで確認する
+
+    全文を一度にメモリへ読まず、インクリメンタルデコーダーにチャンクを
+    流し込んで検証する（チャンク境界でマルチバイト文字が切れても正しく
+    扱える）。読んだ内容はページキャッシュに残るため、直後のsendfileは
+    ほぼメモリコピーで済む。
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        while True:
+            chunk = f.read(1 << 20)
+            if not chunk:
+                decoder.decode(b'', final=True)
+                return True
+            decoder.decode(chunk)
+    except UnicodeDecodeError:
+        return False
+
+
+# バイナリ判定で「テキストらしい」とみなすバイト。制御文字のうち
+# タブ・改行等は許容し、0x80以上はUTF-8のマルチバイト列として許容する
+_TEXTCHAR_BYTES = bytes({7, 8, 9, 10, 11, 12, 13, 27} | set(range(0x20, 0x100)))
+
+
+def _looks_binary(head: bytes) -> bool:
+    """先頭バイト列からバイナリファイルらしいか判定する
+
+    NULバイトがあれば即バイナリ、それ以外は制御文字の比率が30%を
+    超えるかで判定する（gitと同系統のヒューリスティック）。
+    """
+    if b'\x00' in head:
+        return True
+    if not head:
+        return False
+    return len(head.translate(None, _TEXTCHAR_BYTES)) / len(head) > 0.30
+
+
+def _read_text_file(file_path: str) -> Optional[str]:
+    """テキストファイルを読み込む。バイナリと判定した場合はNoneを返す
+
+    まず先頭4KiBを読んでバイナリ判定し、該当すれば残りの読み込みを
+    省略する。デコードもUTF-8で失敗したらlatin-1に切り替える
+    一括処理で、errors='ignore'の文字単位エラーハンドラーより速い。
+    ソースコードの大半は純ASCIIなので、isascii()ならデコーダーを
+    通さずC実装のチェック1回で済む。
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(4096)
+        if _looks_binary(head):
+            return None
+        data = head + f.read()
+
+    if data.isascii():
+        return data.decode('ascii')
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+
+def _extract_xlsx_text(source) -> str:
+    """Excelワークブックからテキストを抽出する
+
+    read_only=Trueでセルのオブジェクトグラフを構築せずXMLからストリーム
+    読み出しし、data_only=Trueで数式文字列ではなくキャッシュ値を返す。
+    大きなワークブックでは速度・メモリともに大幅に有利。
+    """
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        parts = []
+        for sheet_name in workbook.sheetnames:
+            sheet = workbook[sheet_name]
+            parts.append(f"Sheet: {sheet_name}\n")
+            for row in sheet.iter_rows(values_only=True):
+                row_text = "\t".join(str(cell) if cell is not None else "" for cell in row)
+                if row_text.strip():
+                    parts.append(row_text + "\n")
+            parts.append("\n")
+        return "".join(parts)
+    finally:
+        # read_onlyモードではzipハンドルを明示的に閉じる必要がある
+        workbook.close()
+
+
+# WordprocessingML名前空間（w:t要素の直接走査用）
+_DOCX_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def _extract_docx_text(source) -> str:
+    """Wordドキュメントからテキストを抽出する
+
+    doc.paragraphsは段落毎にPythonのラッパーオブジェクトを構築して
+    XPath照会を繰り返すため、大きな文書ではオブジェクト生成コストが
+    支配的になる。w:p/w:t要素をlxmlのiterでC走査して直接テキストを
+    集める。ラン（w:t）は書式変更の境界で分かれるだけなので段落内では
+    そのまま連結し、改行は段落間にのみ入れる。
+    """
+    doc = docx.Document(source)
+    body = doc.element.body
+    paragraphs = []
+    for p in body.iter(f"{_DOCX_NS}p"):
+        text = "".join(t.text for t in p.iter(f"{_DOCX_NS}t") if t.text)
+        if text.strip():
+            paragraphs.append(text)
+    return "\n".join(paragraphs) + "\n" if paragraphs else ""
+
+
+def _handle_pdf(file_path: str) -> str:
+    """PDFファイルを抽出するハンドラー"""
+    try:
+        return _extract_pdf_text(file_path)
+    except Exception as e:
+        return f"[ERROR: Failed to extract PDF content: {str(e)}]"
+
+
+def _handle_xlsx(file_path: str) -> str:
+    """Excelファイルを抽出するハンドラー"""
+    try:
+        return _extract_xlsx_text(file_path)
+    except Exception as e:
+        return f"[ERROR: Failed to extract Excel content: {str(e)}]"
+
+
+def _handle_docx(file_path: str) -> str:
+    """Wordファイルを抽出するハンドラー"""
+    try:
+        return _extract_docx_text(file_path)
+    except Exception as e:
+        return f"[ERROR: Failed to extract Word content: {str(e)}]"
+
+
+def _handle_text(file_path: str) -> str:
+    """テキスト（またはその他の）ファイルを読み込むハンドラー"""
+    try:
+        content = _read_text_file(file_path)
+    except Exception as e:
+        return f"[ERROR: Failed to read file: {str(e)}]"
+    if content is None:
+        return "[WARNING: Binary content detected. Content was skipped.]"
+    return content
+
+
+# 拡張子→ハンドラーのディスパッチテーブル（該当なしは_handle_text）
+_EXT_HANDLERS = {
+    '.pdf': _handle_pdf,
+    '.xlsx': _handle_xlsx,
+    '.docx': _handle_docx,
+}
+
+
+def _extract_binary_from_bytes(url: str, data: bytes) -> str:
+    """ダウンロード済みバイナリデータからテキストを抽出する
+
+    モジュールレベルの関数なのでワーカープロセスへそのまま投入できる
+    （インスタンスメソッドはロックを抱えたselfがpickleできない）。
+    """
+    ext = Path(urlparse(url).path).suffix.lower()
+    buf = io.BytesIO(data)
+
+    if ext == '.pdf':
+        try:
+            return _extract_pdf_text(buf)
+        except Exception as e:
+            return f"[ERROR: Failed to extract PDF content: {str(e)}]"
+    elif ext == '.xlsx':
+        try:
+            return _extract_xlsx_text(buf)
+        except Exception as e:
+            return f"[ERROR: Failed to extract Excel content: {str(e)}]"
+    elif ext == '.docx':
+        try:
+            return _extract_docx_text(buf)
+        except Exception as e:
+            return f"[ERROR: Failed to extract Word content: {str(e)}]"
+    else:
+        return f"[WARNING: Binary file format ({ext}) is not supported for content extraction.]"
+
+
+def _extract_pdf_text(source) -> str:
+    """PDFからテキストを抽出する
+
+    テキストのみが必要なので、C実装のPDFiumバックエンド（pypdfium2）を
+    優先して使う。pdfplumber（pdfminer.six）はレイアウト解析まで行うため
+    テキスト抽出だけなら一桁以上遅い。
+    """
+    if pdfium is not None:
+        pdf = pdfium.PdfDocument(source)
+        try:
+            parts = []
+            for page in pdf:
+                textpage = page.get_textpage()
+                parts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+            return "\n".join(parts)
+        finally:
+            pdf.close()
+
+    if pdfplumber is None:
+        raise RuntimeError("No PDF backend available (pypdfium2 / pdfplumber)")
+
+    with pdfplumber.open(source) as pdf:
+        num_pages = len(pdf.pages)
+
+        # 各ページの解析は独立なので、ページ数が多いPDFはページ単位で並列化する。
+        # ワーカープロセス内からの入れ子プール生成は避け、メインプロセスでのみ使う
+        if (isinstance(source, str) and num_pages >= _PAGE_POOL_MIN_PAGES
+                and multiprocessing.current_process().name == 'MainProcess'):
+            pages = _get_cpu_pool().map(
+                _extract_pdf_page, [source] * num_pages, range(num_pages))
+            return "".join(page_text + "\n" for page_text in pages if page_text)
+
+        # 文字列への += はO(N^2)になるためリストに溜めて最後に結合する
+        parts = []
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                parts.append(page_text)
+        return "\n".join(parts) + "\n" if parts else ""
+
 
 class FileAggregator:
-    def __init__(self, input_source: str, output_file: str):
+    # スキップするファイル/ディレクトリのパターン（クラス定数）
+    _SKIP_PATTERNS = (
+        r'bin$', r'obj$', r'\.git$', r'\.vs$', r'__pycache__$',
+        r'node_modules$', r'\.exe$', r'\.dll$', r'\.pdb$',
+        r'\.zip$', r'\.tar\.gz$', r'\.log$', r'\.jpg$',
+        r'\.jpeg$', r'\.png$', r'\.ico$', r'\.css$', r'\.js$',
+        r'\.so$', r'\.dylib$', r'\.woff2?$', r'\.ttf$',
+        r'\.eot$', r'\.wasm$', r'\.mp4$', r'\.webm$'
+    )
+    # 結合済みパターンのキャッシュ（インスタンス間で共有）
+    _skip_re_cache: Optional[re.Pattern] = None
+
+    @classmethod
+    def _get_skip_re(cls) -> re.Pattern:
+        """スキップ判定用の結合正規表現を返す（初回のみコンパイル）
+
+        パターン毎にre.searchを繰り返すと1ファイルあたり20回以上の
+        正規表現評価になるため、1つの選択式にまとめて1回で判定する。
+        長寿命プロセス（GUIからのインプロセス実行等）でインスタンスを
+        繰り返し作ってもコンパイルは1度きり。
+        """
+        if cls._skip_re_cache is None:
+            cls._skip_re_cache = re.compile(
+                '|'.join(f'(?:{p})' for p in cls._SKIP_PATTERNS), re.IGNORECASE)
+        return cls._skip_re_cache
+
+    def __init__(self, input_source: str, output_file: str,
+                 progress_callback=None):
         self.input_source = input_source
         self.output_file = output_file
+        # 進捗通知用コールバック (percent, current_file, eta_str) を受け取る。
+        # 未指定ならCLI向けに標準出力へ表示する
+        self._progress_cb = progress_callback
         self.visited_urls: Set[str] = set()
         self.base_domain = None
         self.base_path = None
@@ -33,22 +415,28 @@ class FileAggregator:
         self.total_files = 0
         self.processed_files = 0
         self.start_time = None
+        # 経過時間の計測用（壁時計と違い単調で、減算だけで済む）
+        self._start_monotonic = None
+        # 前回進捗を通知した時刻（スロットリング用）
+        self._last_update = 0.0
         self.current_file = ""
         self.lock = threading.Lock()
         
-        # スキップするファイル/ディレクトリのリスト
-        self.skip_patterns = [
-            r'bin$', r'obj$', r'\.git$', r'\.vs$', r'__pycache__$',
-            r'node_modules$', r'\.exe$', r'\.dll$', r'\.pdb$',
-            r'\.zip$', r'\.tar\.gz$', r'\.log$', r'\.jpg$',
-            r'\.jpeg$', r'\.png$', r'\.ico$', r'\.css$', r'\.js$'
-        ]
-        
-        # 未対応のファイル形式
-        self.unsupported_formats = {'.xls', '.doc'}
-        
-        # 並列処理用の設定
-        self.max_workers = min(multiprocessing.cpu_count(), 8)  # 最大8ワーカーに制限
+        # スキップするファイル/ディレクトリのパターン（コンパイル済み
+        # 正規表現はクラスレベルでキャッシュして全インスタンスで共有）
+        self.skip_patterns = self._SKIP_PATTERNS
+        self._skip_re = self._get_skip_re()
+
+        # 未対応のファイル形式（頻繁に参照するためfrozensetでO(1)判定）
+        self.unsupported_formats = frozenset({'.xls', '.doc'})
+
+        # 同一ホストへの最小リクエスト間隔（秒）。ホスト毎に管理するため
+        # 全体を壁時計で直列化せずに礼儀正しさを保てる
+        self.min_request_interval = 0.2
+
+        # 並列処理用の設定。ファイル読み込みはI/Oバウンドで、バイナリ抽出も
+        # C実装部分でGILが解放されるため、スレッド数を多めに確保する
+        self.io_workers = min(32, (os.cpu_count() or 1) * 4)
     
     def is_web_url(self, source: str) -> bool:
         """入力ソースがWeb URLかどうかを判定"""
@@ -56,10 +444,7 @@ class FileAggregator:
     
     def should_skip_file(self, file_path: str) -> bool:
         """ファイルをスキップすべきか判定"""
-        for pattern in self.skip_patterns:
-            if re.search(pattern, file_path, re.IGNORECASE):
-                return True
-        return False
+        return self._skip_re.search(file_path) is not None
     
     def is_unsupported_format(self, file_path: str) -> bool:
         """未対応のファイル形式か判定"""
@@ -69,395 +454,599 @@ class FileAggregator:
     def extract_pdf_text(self, file_path: str) -> str:
         """PDFファイルからテキストを抽出"""
         try:
-            with pdfplumber.open(file_path) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                return text
+            return _extract_pdf_text(file_path)
         except Exception as e:
             return f"[ERROR: Failed to extract PDF content: {str(e)}]"
     
     def extract_xlsx_text(self, file_path: str) -> str:
         """Excelファイルからテキストを抽出"""
         try:
-            workbook = openpyxl.load_workbook(file_path)
-            text = ""
-            for sheet_name in workbook.sheetnames:
-                sheet = workbook[sheet_name]
-                text += f"Sheet: {sheet_name}\n"
-                for row in sheet.iter_rows(values_only=True):
-                    row_text = "\t".join([str(cell) if cell is not None else "" for cell in row])
-                    if row_text.strip():
-                        text += row_text + "\n"
-                text += "\n"
-            return text
+            return _extract_xlsx_text(file_path)
         except Exception as e:
             return f"[ERROR: Failed to extract Excel content: {str(e)}]"
     
     def extract_docx_text(self, file_path: str) -> str:
         """Wordファイルからテキストを抽出"""
         try:
-            doc = docx.Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text += paragraph.text + "\n"
-            return text
+            return _extract_docx_text(file_path)
         except Exception as e:
             return f"[ERROR: Failed to extract Word content: {str(e)}]"
     
     def update_progress(self):
-        """進捗状況を表示"""
-        with self.lock:
-            if self.total_files > 0:
-                progress_percent = (self.processed_files / self.total_files) * 100
-                elapsed = datetime.now() - self.start_time if self.start_time else timedelta(0)
-                
-                if self.processed_files > 0 and elapsed.total_seconds() > 0:
-                    # 処理速度（ファイル/秒）
-                    rate = self.processed_files / elapsed.total_seconds()
-                    # 残りファイル数
-                    remaining_files = self.total_files - self.processed_files
-                    # 残り時間予測（秒）
-                    remaining_seconds = remaining_files / rate if rate > 0 else 0
-                    # 予測完了時刻
-                    eta = datetime.now() + timedelta(seconds=remaining_seconds)
-                    eta_str = eta.strftime("%Y-%m-%d %H:%M:%S")
-                else:
-                    eta_str = "計算中..."
-                
-                print(f"\r進捗: {progress_percent:.1f}% ({self.processed_files}/{self.total_files} ファイル) "
-                      f"現在処理中: {self.current_file} "
-                      f"完了予定時刻: {eta_str}", end="", flush=True)
+        """進捗状況を通知する（呼び出し側がself.lockを保持していること）
+
+        ファイル毎に整形・出力すると小さいファイル数万件の処理では
+        端末書き込みの方が支配的になるため、0.2秒に1回（と完了時）だけ
+        通知する。スロットルで弾いた呼び出しは時刻比較1回で抜ける。
+        """
+        if self.total_files <= 0:
+            return
+
+        now = time.monotonic()
+        if (now - self._last_update < 0.2
+                and self.processed_files != self.total_files):
+            return
+        self._last_update = now
+
+        progress_percent = (self.processed_files / self.total_files) * 100
+        elapsed = now - self._start_monotonic if self._start_monotonic else 0.0
+
+        if self.processed_files > 0 and elapsed > 0:
+            # 処理速度（ファイル/秒）から残り時間を予測する
+            rate = self.processed_files / elapsed
+            remaining_files = self.total_files - self.processed_files
+            remaining_seconds = remaining_files / rate if rate > 0 else 0
+            # 予測完了時刻（整形は実際に通知するときだけ行う）
+            eta = datetime.now() + timedelta(seconds=remaining_seconds)
+            eta_str = eta.strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            eta_str = "計算中..."
+
+        if self._progress_cb is not None:
+            self._progress_cb(progress_percent, self.current_file, eta_str)
+            return
+
+        print(f"\r進捗: {progress_percent:.1f}% ({self.processed_files}/{self.total_files} ファイル) "
+              f"現在処理中: {self.current_file} "
+              f"完了予定時刻: {eta_str}", end="", flush=True)
     
-    def process_local_file(self, file_path: str, relative_path: str) -> str:
-        """ローカルファイルを処理"""
+    def process_local_file(self, file_path: str, relative_path: str,
+                           ext: Optional[str] = None) -> str:
+        """ローカルファイルを処理
+
+        拡張子は呼び出し側で計算済みなら受け取り、パスの再解析を避ける。
+        """
         with self.lock:
             self.current_file = relative_path
-        
+
+        if ext is None:
+            ext = Path(relative_path).suffix.lower()
+
         if self.should_skip_file(relative_path):
             with self.lock:
                 self.processed_files += 1
                 self.update_progress()
             return ""
-        
-        if self.is_unsupported_format(relative_path):
+
+        if ext in self.unsupported_formats:
             with self.lock:
                 self.processed_files += 1
                 self.update_progress()
-            return f"# File: {relative_path}\n```text\n[WARNING: The file format ({Path(relative_path).suffix}) is not supported. Content was skipped.]\n```\n\n"
-        
-        ext = Path(relative_path).suffix.lower()
-        
+            return f"# File: {relative_path}\n```text\n[WARNING: The file format ({ext}) is not supported. Content was skipped.]\n```\n\n"
+
         try:
-            if ext == '.pdf':
-                content = self.extract_pdf_text(file_path)
-                result = f"# File: {relative_path}\n```text\n{content}\n```\n\n"
-            elif ext == '.xlsx':
-                content = self.extract_xlsx_text(file_path)
-                result = f"# File: {relative_path}\n```text\n{content}\n```\n\n"
-            elif ext == '.docx':
-                content = self.extract_docx_text(file_path)
-                result = f"# File: {relative_path}\n```text\n{content}\n```\n\n"
-            elif ext in ['.txt', '.md', '.py', '.js', '.html', '.css', '.json', '.xml', '.yaml', '.yml', '.csv', '.sql']:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                result = f"# File: {relative_path}\n```{ext[1:] if ext else 'text'}\n{content}\n```\n\n"
-            else:
-                # テキストファイルとして読み込みを試みる
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                result = f"# File: {relative_path}\n```text\n{content}\n```\n\n"
+            # 拡張子→ハンドラーのO(1)ディスパッチ（ワーカーと同じ経路）
+            handler = _EXT_HANDLERS.get(ext, _handle_text)
+            content = handler(file_path)
+            result = f"# File: {relative_path}\n```{_fence_language(ext)}\n{content}\n```\n\n"
         except Exception as e:
             result = f"# File: {relative_path}\n```text\n[ERROR: Failed to read file: {str(e)}]\n```\n\n"
-        
+
         with self.lock:
             self.processed_files += 1
             self.update_progress()
-        
+
         return result
     
     @staticmethod
-    def process_file_worker(args: Tuple[str, str, List[str], Set[str]]) -> Tuple[str, str]:
-        """ワーカープロセスでファイルを処理する静的メソッド"""
-        file_path, relative_path, skip_patterns, unsupported_formats = args
-        
-        # スキップパターンのチェック
-        for pattern in skip_patterns:
-            if re.search(pattern, relative_path, re.IGNORECASE):
-                return relative_path, ""
-        
-        # 未対応フォーマットのチェック
-        ext = Path(relative_path).suffix.lower()
-        if ext in unsupported_formats:
-            return relative_path, f"# File: {relative_path}\n```text\n[WARNING: The file format ({ext}) is not supported. Content was skipped.]\n```\n\n"
-        
-        # ファイル処理
+    def _is_large_file(file_path: str) -> bool:
+        """sendfile転送の対象となるサイズか判定する"""
         try:
-            if ext == '.pdf':
-                # PDF処理
-                try:
-                    with pdfplumber.open(file_path) as pdf:
-                        text = ""
-                        for page in pdf.pages:
-                            page_text = page.extract_text()
-                            if page_text:
-                                text += page_text + "\n"
-                        content = text
-                except Exception as e:
-                    content = f"[ERROR: Failed to extract PDF content: {str(e)}]"
-                result = f"# File: {relative_path}\n```text\n{content}\n```\n\n"
-            elif ext == '.xlsx':
-                # Excel処理
-                try:
-                    workbook = openpyxl.load_workbook(file_path)
-                    text = ""
-                    for sheet_name in workbook.sheetnames:
-                        sheet = workbook[sheet_name]
-                        text += f"Sheet: {sheet_name}\n"
-                        for row in sheet.iter_rows(values_only=True):
-                            row_text = "\t".join([str(cell) if cell is not None else "" for cell in row])
-                            if row_text.strip():
-                                text += row_text + "\n"
-                        text += "\n"
-                    content = text
-                except Exception as e:
-                    content = f"[ERROR: Failed to extract Excel content: {str(e)}]"
-                result = f"# File: {relative_path}\n```text\n{content}\n```\n\n"
-            elif ext == '.docx':
-                # Word処理
-                try:
-                    doc = docx.Document(file_path)
-                    text = ""
-                    for paragraph in doc.paragraphs:
-                        if paragraph.text.strip():
-                            text += paragraph.text + "\n"
-                    content = text
-                except Exception as e:
-                    content = f"[ERROR: Failed to extract Word content: {str(e)}]"
-                result = f"# File: {relative_path}\n```text\n{content}\n```\n\n"
-            elif ext in ['.txt', '.md', '.py', '.js', '.html', '.css', '.json', '.xml', '.yaml', '.yml', '.csv', '.sql']:
-                # テキストファイル処理
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    result = f"# File: {relative_path}\n```{ext[1:] if ext else 'text'}\n{content}\n```\n\n"
-                except Exception as e:
-                    result = f"# File: {relative_path}\n```text\n[ERROR: Failed to read file: {str(e)}]\n```\n\n"
-            else:
-                # その他のファイル形式
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    result = f"# File: {relative_path}\n```text\n{content}\n```\n\n"
-                except Exception as e:
-                    result = f"# File: {relative_path}\n```text\n[ERROR: Failed to read file: {str(e)}]\n```\n\n"
-        except Exception as e:
-            result = f"# File: {relative_path}\n```text\n[ERROR: Failed to process file: {str(e)}]\n```\n\n"
-        
-        return relative_path, result
-    
-    def process_local_directory_parallel(self, root_path: str) -> str:
-        """ローカルディレクトリを並列処理"""
-        root_path = Path(root_path).resolve()
-        
-        # まず全ファイル数をカウント
+            return os.path.getsize(file_path) >= _SENDFILE_MIN_SIZE
+        except OSError:
+            return False
+
+    def _sendfile_text_block(self, file_path: str, relative_path: str,
+                             ext: str, out) -> bool:
+        """大きなテキストファイルをカーネル内コピーで出力へ転送する
+
+        file.read()とf-string整形はファイルサイズの2倍の一時メモリを作る。
+        os.sendfileならバイト列がユーザー空間を経由せず、ピークメモリは
+        コピーバッファ分で済む。書き出せた場合はTrue、通常経路で処理すべき
+        内容（バイナリやUTF-8でないもの）の場合はFalseを返す。
+        """
+        try:
+            src = open(file_path, 'rb')
+        except OSError:
+            return False
+
+        with src:
+            head = src.read(4096)
+            if b'\x00' in head or not _mostly_utf8(head):
+                return False
+
+            # sendfileは生バイトをそのまま出力へ流すため、先頭だけでなく
+            # ファイル全体がUTF-8として正しいことを確認する。途中に
+            # latin-1等が混じったファイルをコピーすると出力ファイル自体が
+            # UTF-8として読めなくなる（通常経路ならlatin-1へフォールバック
+            # して有効な出力を保てる）
+            src.seek(0)
+            if not _file_is_utf8(src):
+                return False
+            src.seek(0)
+
+            try:
+                size = os.fstat(src.fileno()).st_size
+            except OSError:
+                return False
+
+            out.write(f"# File: {relative_path}\n```{_fence_language(ext)}\n")
+            out.flush()  # 生のfdへ書く前にバッファを吐き出す
+            try:
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(out.fileno(), src.fileno(), offset,
+                                       min(1 << 20, size - offset))
+                    if sent == 0:
+                        break
+                    offset += sent
+            except OSError as e:
+                out.write(f"[ERROR: Failed to read file: {str(e)}]")
+            out.write("\n```\n\n")
+
+        return True
+
+    def _iter_files(self, root: str):
+        """os.scandirでディレクトリを再帰走査し (絶対パス, 相対パス) を返す
+
+        DirEntryはdirentの情報をキャッシュしているため、Path.rglobの
+        is_file()やrelative_to()で発生する追加のstat・パス解析を避けられる。
+        """
+        prefix_len = len(root) + len(os.sep)
+
+        def _walk(dirpath: str):
+            try:
+                it = os.scandir(dirpath)
+            except OSError as e:
+                # 権限の無いディレクトリ等は走査全体を落とさずスキップする
+                # （Path.rglobも読めないディレクトリは黙って飛ばしていた）
+                print(f"\n走査をスキップ: {dirpath} ({e.strerror})")
+                return
+            with it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        # スキップ対象のディレクトリ（.git, node_modules等）は
+                        # 中に降りず、サブツリーの走査ごと省略する。
+                        # 除外リストは正確な名前なのでsetの完全一致で判定する
+                        # （正規表現のbin$等を使うと「cabin」のような名前の
+                        # ディレクトリまで巻き込まれてしまう）
+                        if entry.name in _SKIP_DIR_NAMES:
+                            continue
+                        yield from _walk(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        # ここに来た時点で親ディレクトリは非スキップと分類済み
+                        # なので、ファイルの判定は名前だけで足りる
+                        # （skip_patternsはすべて末尾アンカーでセパレーターを跨がない）
+                        if self._skip_re.search(entry.name):
+                            continue
+                        yield entry.path, entry.path[prefix_len:]
+
+        yield from _walk(root)
+
+    def process_local_directory_parallel(self, root_path: str, out) -> None:
+        """ローカルディレクトリを並列処理し、結果をoutへ書き出す"""
+        root_path = str(Path(root_path).resolve())
+
+        # まず全ファイル数をカウント（スキップ判定は走査中に済んでいる）
         print("ファイル数をカウント中...")
-        all_files = [(str(file_path), str(file_path.relative_to(root_path)))
-                    for file_path in root_path.rglob('*')
-                    if file_path.is_file() and not self.should_skip_file(str(file_path.relative_to(root_path)))]
+        all_files = list(self._iter_files(root_path))
         
         self.total_files = len(all_files)
         self.processed_files = 0
         self.start_time = datetime.now()
-        
-        print(f"並列処理開始: 合計 {self.total_files} ファイル（{self.max_workers} ワーカー）")
-        
+        self._start_monotonic = time.monotonic()
+
+        print(f"並列処理開始: 合計 {self.total_files} ファイル"
+              f"（{self.io_workers} スレッド）")
+
+        # テキスト・XLSX・DOCXはスレッドプールで処理する。テキスト読み込みは
+        # I/Oバウンドで、抽出もC実装部分（lxml、zipfile展開）でGILが解放
+        # されるためスレッドで並列化できる。PDFだけはプロセスプールへ送る：
+        # PDFium（pypdfium2のバックエンド）はスレッドセーフではなく、
+        # 複数スレッドからの同時呼び出しは未定義動作になるため
+        worker_files = []
+        pdf_files = []
+        # サイズの大きいテキストファイルはワーカーに渡さず、書き出しフェーズで
+        # os.sendfileによりカーネル内コピーで転送する（相対パス→拡張子）
+        large_text = {}
+        for fp, rp in all_files:
+            # 拡張子はここで1回だけ計算して以降の処理に引き回す
+            ext = os.path.splitext(rp)[1].lower()
+            if ext == '.pdf':
+                pdf_files.append((fp, rp))
+            elif _HAS_SENDFILE and ext in _TEXT_EXTS and self._is_large_file(fp):
+                large_text[rp] = ext
+            else:
+                worker_files.append((fp, rp, ext))
+
         # 結果を格納する辞書（順序保持用）
         results = {}
-        
-        # 並列処理の実行
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            # ワーカーに渡す引数を準備
-            tasks = [(file_path, relative_path, self.skip_patterns, self.unsupported_formats)
-                    for file_path, relative_path in all_files]
-            
-            # タスクをサブミット
-            future_to_path = {executor.submit(self.process_file_worker, task): task[1] for task in tasks}
-            
-            # 完了したタスクから結果を収集
-            for future in as_completed(future_to_path):
-                relative_path = future_to_path[future]
+
+        # 並列処理の実行（process_local_file 内で進捗が更新される）
+        with ThreadPoolExecutor(max_workers=self.io_workers) as executor:
+            pdf_futures = {_get_cpu_pool().submit(_handle_pdf, file_path): relative_path
+                           for file_path, relative_path in pdf_files}
+            futures = {executor.submit(self.process_local_file, file_path, relative_path, ext): relative_path
+                       for file_path, relative_path, ext in worker_files}
+
+            for future in as_completed(futures):
+                relative_path = futures[future]
                 try:
-                    path, result = future.result()
-                    results[path] = result
-                    
-                    # 進捗更新
-                    with self.lock:
-                        self.processed_files += 1
-                        self.current_file = relative_path
-                        self.update_progress()
+                    results[relative_path] = future.result()
                 except Exception as e:
-                    error_result = f"# File: {relative_path}\n```text\n[ERROR: Worker process failed: {str(e)}]\n```\n\n"
-                    results[relative_path] = error_result
-                    
-                    # 進捗更新
-                    with self.lock:
-                        self.processed_files += 1
-                        self.current_file = relative_path
-                        self.update_progress()
-        
-        # 結果を元の順序で結合
-        final_result = ""
-        for _, relative_path in all_files:
-            if relative_path in results:
-                final_result += results[relative_path]
+                    results[relative_path] = f"# File: {relative_path}\n```text\n[ERROR: Worker thread failed: {str(e)}]\n```\n\n"
+
+            # PDFの結果を収集（抽出エラーは_handle_pdf内でメッセージ化済み）
+            for future in as_completed(pdf_futures):
+                relative_path = pdf_futures[future]
+                try:
+                    content = future.result()
+                    results[relative_path] = f"# File: {relative_path}\n```text\n{content}\n```\n\n"
+                except Exception as e:
+                    results[relative_path] = f"# File: {relative_path}\n```text\n[ERROR: Failed to process file: {str(e)}]\n```\n\n"
+                with self.lock:
+                    self.processed_files += 1
+                    self.current_file = relative_path
+                    self.update_progress()
         
+        # 結果を元の順序で出力ファイルへ直接書き出す
+        # （全体を1つの巨大な文字列に結合せず、ピークメモリを抑える）
+        for file_path, relative_path in all_files:
+            ext = large_text.get(relative_path)
+            if ext is not None:
+                if not self._sendfile_text_block(file_path, relative_path, ext, out):
+                    # sendfileできない内容（バイナリ等）は通常経路で処理
+                    out.write(self.process_local_file(file_path, relative_path, ext))
+                    continue
+                with self.lock:
+                    self.processed_files += 1
+                    self.current_file = relative_path
+                    self.update_progress()
+                continue
+            block = results.pop(relative_path, None)
+            if block:
+                out.write(block)
+
         print()  # 進捗表示の後に改行
-        return final_result
     
-    def process_local_directory(self, root_path: str) -> str:
+    def process_local_directory(self, root_path: str, out) -> None:
         """ローカルディレクトリを再帰的に処理"""
         # 並列処理を使用
-        return self.process_local_directory_parallel(root_path)
+        self.process_local_directory_parallel(root_path, out)
     
-    def is_same_domain(self, url: str) -> bool:
-        """URLが同じドメインか判定"""
-        parsed = urlparse(url)
-        return parsed.netloc == self.base_domain
-    
-    def is_under_base_path(self, url: str) -> bool:
-        """URLがベースパス配下か判定"""
+    def _in_scope(self, url: str) -> bool:
+        """URLがクロール範囲（同一ドメインかつベースパス配下）か判定
+
+        urlparseは純Pythonで安くないため、1回のパースで両方の条件を見る。
+        """
+        # ホスト名は大文字小文字を区別しない（base_domainは小文字で保持、
+        # リンク側のnetlocもここで小文字化して比較する）
         parsed = urlparse(url)
-        return parsed.path.startswith(self.base_path)
+        return parsed.netloc.lower() == self.base_domain and parsed.path.startswith(self.base_path)
     
     def download_binary_file(self, url: str, session: requests.Session) -> Optional[str]:
         """バイナリファイルをダウンロードしてテキストを抽出"""
         try:
             response = session.get(url, stream=True)
             response.raise_for_status()
-            
-            # 一時ファイルに保存
-            temp_file = f"temp_{os.path.basename(url)}"
-            with open(temp_file, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            # ファイル拡張子に基づいてテキスト抽出
-            ext = Path(url).suffix.lower()
-            if ext == '.pdf':
-                content = self.extract_pdf_text(temp_file)
-            elif ext == '.xlsx':
-                content = self.extract_xlsx_text(temp_file)
-            elif ext == '.docx':
-                content = self.extract_docx_text(temp_file)
-            else:
-                content = f"[WARNING: Binary file format ({ext}) is not supported for content extraction.]"
-            
-            # 一時ファイルを削除
-            os.remove(temp_file)
-            
-            return content
+
+            # ディスク上の一時ファイルを経由せず、メモリ上のバッファに受ける
+            # （チャンクは一般的なTCP/ディスク転送サイズに合わせて64KiB）
+            buf = io.BytesIO()
+            for chunk in response.iter_content(chunk_size=65536):
+                buf.write(chunk)
+
+            return self._extract_binary_bytes(url, buf.getvalue())
         except Exception as e:
             return f"[ERROR: Failed to download or process {url}: {str(e)}]"
     
-    def crawl_web_page(self, url: str, session: requests.Session) -> str:
-        """Webページをクロールしてコンテンツを抽出"""
-        if url in self.visited_urls:
-            return ""
-        
-        with self.lock:
-            self.current_file = url
-            self.processed_files += 1
-            self.update_progress()
-        
-        self.visited_urls.add(url)
-        
-        try:
-            response = session.get(url)
+    def _parse_html_page(self, url: str, content) -> Tuple[str, List[str]]:
+        """HTMLからテキストと同一スコープ内のリンクを抽出
+
+        C実装のLexborパーサー（selectolax）を優先して使う。純Pythonの
+        html.parserはクロール時の支配的なCPUコストになるため。
+        contentはバイト列を受け取る。BeautifulSoup経路ではファイルライク
+        オブジェクトも受け取れ、受信しながらの逐次パースに使える。
+        """
+        if LexborHTMLParser is not None:
+            tree = LexborHTMLParser(content)
+
+            # スクリプトとスタイルを除去
+            for node in tree.css('script,style'):
+                node.decompose()
+
+            # テキストコンテンツを抽出
+            body = tree.body
+            text = body.text(separator='\n') if body is not None else ''
+
+            # 空行・余分な空白を整理
+            lines = (line.strip() for line in text.splitlines())
+            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+            text = '\n'.join(chunk for chunk in chunks if chunk)
+
+            hrefs = [node.attributes.get('href') for node in tree.css('a[href]')]
+        else:
+            soup = BeautifulSoup(content, _BS4_PARSER)
+
+            # スクリプトとスタイルを除去
+            for script in soup(["script", "style"]):
+                script.decompose()
+
+            # stripped_stringsは1回の走査で空白整理まで済ませる
+            # （get_text後の行分割・二重スペース分割パイプラインより速い）
+            text = "\n".join(soup.stripped_strings)
+            hrefs = [link['href'] for link in soup.find_all('a', href=True)]
+
+        # 同じドメイン・ベースパス配下のリンクを収集
+        # （ナビゲーション等で同じhrefがページを跨いで繰り返されるため、
+        # URL結合はキャッシュ付きヘルパーで行う）
+        links = []
+        for href in hrefs:
+            if not href:
+                continue
+            absolute_url = _urljoin(url, href)
+            if self._in_scope(absolute_url):
+                links.append(absolute_url)
+
+        return text, links
+
+    def _extract_binary_bytes(self, url: str, data: bytes) -> str:
+        """ダウンロード済みバイナリデータからテキストを抽出
+
+        pdfplumber/pypdfium2・openpyxl・python-docxはいずれもファイル
+        オブジェクトを受け付けるため、一時ファイルを経由せずメモリ上の
+        バッファから直接抽出する。同期クローラーは複数スレッドからここに
+        来るため、抽出はプロセスプールへ送る（PDFiumはスレッドセーフで
+        はない。非同期クローラーと同じ経路）。
+        """
+        return _get_cpu_pool().submit(_extract_binary_from_bytes, url, data).result()
+
+    async def _wait_host_interval(self, url: str, last_request_time: dict,
+                                  host_locks: dict) -> None:
+        """ホスト毎の最小リクエスト間隔を守るよう待機する
+
+        ホスト単位のロックで最終リクエスト時刻の更新を直列化し、複数
+        ワーカーが同時に同じホストへ突入するレースを防ぐ。
+        """
+        loop = asyncio.get_running_loop()
+        host = urlparse(url).netloc
+        lock = host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self.min_request_interval - (loop.time() - last_request_time.get(host, float('-inf')))
+            if wait > 0:
+                await asyncio.sleep(wait)
+            last_request_time[host] = loop.time()
+
+    async def _fetch_page_async(self, session, url: str, last_request_time: dict,
+                                host_locks: dict) -> Tuple[str, List[str]]:
+        """1つのURLを非同期で取得してMarkdownブロックとリンクを返す"""
+        loop = asyncio.get_running_loop()
+
+        # サーバー負荷軽減のためホスト毎にリクエスト間隔を空ける
+        await self._wait_host_interval(url, last_request_time, host_locks)
+
+        async with session.get(url) as response:
             response.raise_for_status()
-            
-            # コンテンツタイプを確認
             content_type = response.headers.get('content-type', '').lower()
-            
-            # バイナリファイルの場合
+
+            # バイナリファイルの場合。抽出はCPUバウンドでGILを握るため、
+            # スレッドではなく共有プロセスプールへ逃がしてループを塞がない
             if any(ext in url.lower() for ext in ['.pdf', '.xlsx', '.docx']):
-                content = self.download_binary_file(url, session)
-                return f"# URL: {url}\n```text\n{content}\n```\n\n"
-            
+                data = await response.read()
+                content = await loop.run_in_executor(
+                    _get_cpu_pool(), _extract_binary_from_bytes, url, data)
+                return f"# URL: {url}\n```text\n{content}\n```\n\n", []
+
             # HTMLページの場合
             if 'text/html' in content_type:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # スクリプトとスタイルを除去
-                for script in soup(["script", "style"]):
-                    script.decompose()
-                
-                # テキストコンテンツを抽出
-                text = soup.get_text()
-                lines = (line.strip() for line in text.splitlines())
-                chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                text = '\n'.join(chunk for chunk in chunks if chunk)
-                
-                result = f"# URL: {url}\n```text\n{text}\n```\n\n"
-                
-                # 同じドメイン内のリンクを探索
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
-                    absolute_url = urljoin(url, href)
-                    
-                    if self.is_same_domain(absolute_url) and self.is_under_base_path(absolute_url):
-                        if absolute_url not in self.visited_urls:
-                            time.sleep(1)  # サーバー負荷軽減のための遅延
-                            result += self.crawl_web_page(absolute_url, session)
-                
-                return result
-            else:
-                # その他のコンテンツタイプ
-                return f"# URL: {url}\n```text\n[WARNING: Content type '{content_type}' is not supported for text extraction.]\n```\n\n"
-                
-        except Exception as e:
-            return f"# URL: {url}\n```text\n[ERROR: Failed to crawl {url}: {str(e)}]\n```\n\n"
-    
-    def process_web_source(self, start_url: str) -> str:
+                data = await response.read()
+                text, links = self._parse_html_page(url, data)
+                return f"# URL: {url}\n```text\n{text}\n```\n\n", links
+
+            # その他のコンテンツタイプ
+            return f"# URL: {url}\n```text\n[WARNING: Content type '{content_type}' is not supported for text extraction.]\n```\n\n", []
+
+    async def _crawl_web_async(self, start_url: str, out, concurrency: int = 8) -> None:
+        """aiohttpによる非同期BFSクロール
+
+        ワーカータスクがキューからURLを取り出して並行取得し、発見した
+        同一スコープ内のリンクをキューに戻す。DNS/TCP/TLS/HTTPの待ち時間を
+        複数URL間で重ね合わせられる。各ブロックは生成され次第outへ書き出す
+        （イベントループ上で直列に実行されるため排他は不要）。
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        start_url = _canonicalize_url(start_url)
+        await queue.put(start_url)
+        self.visited_urls.add(start_url)
+
+        visited_lock = asyncio.Lock()
+        last_request_time: dict = {}
+        host_locks: dict = {}
+
+        connector = aiohttp.TCPConnector(limit_per_host=8)
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+
+        async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+            async def worker():
+                while True:
+                    url = await queue.get()
+                    try:
+                        block, links = await self._fetch_page_async(
+                            session, url, last_request_time, host_locks)
+                        out.write(block)
+
+                        # 未訪問リンクをキューへ追加（正規形で重複判定する）
+                        canonical = {_canonicalize_url(l) for l in links}
+                        async with visited_lock:
+                            new_links = [l for l in canonical if l not in self.visited_urls]
+                            self.visited_urls.update(new_links)
+                        for l in new_links:
+                            await queue.put(l)
+                    except Exception as e:
+                        out.write(f"# URL: {url}\n```text\n[ERROR: Failed to crawl {url}: {str(e)}]\n```\n\n")
+                    finally:
+                        with self.lock:
+                            self.processed_files += 1
+                            self.current_file = url
+                            self.update_progress()
+                        queue.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+            await queue.join()
+            for w in workers:
+                w.cancel()
+
+    def crawl_web_page(self, start_url: str, session: requests.Session, out) -> None:
+        """Webページをクロールしてコンテンツを抽出（同期クローラー）
+
+        aiohttpが無い環境向けのフォールバック。フロンティアのURLを
+        スレッドプールで並行取得し、取得はI/Oバウンドなのでリクエストの
+        待ち時間を複数URL間で重ね合わせる。完了したブロックはメインスレッドが
+        到着順にoutへ書き出し、全ページ分を文字列として保持しない。
+        """
+        last_request_time: dict = {}
+        rate_lock = threading.Lock()
+
+        def _fetch(url: str) -> Tuple[str, List[str]]:
+            """1つのURLを取得してMarkdownブロックとリンクを返す"""
+            # サーバー負荷軽減のため、同一ホストへの連続リクエストのみ間隔を空ける
+            # （クロール範囲は同一ドメインなのでロックはホスト毎と等価）
+            with rate_lock:
+                host = urlparse(url).netloc
+                wait_sec = self.min_request_interval - (time.monotonic() - last_request_time.get(host, float('-inf')))
+                if wait_sec > 0:
+                    time.sleep(wait_sec)
+                last_request_time[host] = time.monotonic()
+
+            with self.lock:
+                self.current_file = url
+                self.processed_files += 1
+                self.update_progress()
+
+            try:
+                # stream=Trueでヘッダー受信時点で制御が戻る。本文はパース側が
+                # 必要な分だけ取り込むので、バイナリ判定等で本文を使わない
+                # 場合に全文ダウンロードを待たない
+                response = session.get(url, stream=True)
+                try:
+                    response.raise_for_status()
+
+                    # コンテンツタイプを確認
+                    content_type = response.headers.get('content-type', '').lower()
+
+                    # バイナリファイルの場合
+                    if any(ext in url.lower() for ext in ['.pdf', '.xlsx', '.docx']):
+                        content = self.download_binary_file(url, session)
+                        return f"# URL: {url}\n```text\n{content}\n```\n\n", []
+
+                    # HTMLページの場合
+                    if 'text/html' in content_type:
+                        if LexborHTMLParser is not None:
+                            # selectolaxはバイト列のみ受け取るため一括で読む
+                            text, links = self._parse_html_page(url, response.content)
+                        else:
+                            # BeautifulSoup(lxml)はファイルライクを逐次パース
+                            # できるので、全文をメモリに貯めずに受信と
+                            # パースを重ね合わせる
+                            response.raw.decode_content = True
+                            text, links = self._parse_html_page(url, response.raw)
+                        return f"# URL: {url}\n```text\n{text}\n```\n\n", links
+
+                    # その他のコンテンツタイプ
+                    return f"# URL: {url}\n```text\n[WARNING: Content type '{content_type}' is not supported for text extraction.]\n```\n\n", []
+                finally:
+                    response.close()
+            except Exception as e:
+                return f"# URL: {url}\n```text\n[ERROR: Failed to crawl {url}: {str(e)}]\n```\n\n", []
+
+        # フロンティアをスレッドプールで並行取得する。訪問済み集合の更新は
+        # メインスレッドだけが行うためロック不要
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            start_url = _canonicalize_url(start_url)
+            self.visited_urls.add(start_url)
+            pending = {executor.submit(_fetch, start_url)}
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    block, links = future.result()
+                    out.write(block)
+                    for absolute_url in links:
+                        # 正規形で重複判定する（追跡パラメータ等の違いを無視）
+                        canonical = _canonicalize_url(absolute_url)
+                        if canonical not in self.visited_urls:
+                            self.visited_urls.add(canonical)
+                            pending.add(executor.submit(_fetch, canonical))
+
+    def process_web_source(self, start_url: str, out) -> None:
         """Webソースを処理"""
         parsed = urlparse(start_url)
-        self.base_domain = parsed.netloc
+        # _canonicalize_urlがホストを小文字化するため、スコープ側も小文字で
+        # 揃えないと大文字混じりの開始URLでクロールが1ページで止まる
+        self.base_domain = parsed.netloc.lower()
         self.base_path = '/'.join(parsed.path.split('/')[:-1]) if '/' in parsed.path else '/'
         
         # Webクロール用の初期化
         self.total_files = 50  # 見積もり値（実際のページ数はクロール中に変動）
         self.processed_files = 0
         self.start_time = datetime.now()
+        self._start_monotonic = time.monotonic()
         
         print(f"Webクロール開始: {start_url}")
-        
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        
-        result = self.crawl_web_page(start_url, session)
-        
+
+        if aiohttp is not None:
+            # 非同期クローラーで複数URLを並行取得
+            asyncio.run(self._crawl_web_async(start_url, out))
+        else:
+            # aiohttpが無い場合は同期クローラーにフォールバック
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            })
+            # 接続プールを広げてkeep-aliveを効かせ、一時的な失敗はリトライする
+            adapter = HTTPAdapter(
+                pool_connections=64, pool_maxsize=64,
+                max_retries=Retry(total=3, backoff_factor=0.5))
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self.crawl_web_page(start_url, session, out)
+
         print()  # 進捗表示の後に改行
-        return result
     
     def aggregate(self):
         """メインの集約処理"""
         print(f"開始: {self.input_source}")
         start_time = datetime.now()
         
-        if self.is_web_url(self.input_source):
-            content = self.process_web_source(self.input_source)
-        else:
-            content = self.process_local_directory(self.input_source)
-        
-        # 出力ファイルに書き込み
-        print("出力ファイルを作成中...")
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # 出力ファイルは最初に開き、各ブロックを生成され次第書き出す
+        # （大きめのバッファでflush回数を抑える）
+        with open(self.output_file, 'w', encoding='utf-8', buffering=1024 * 1024) as out:
+            if self.is_web_url(self.input_source):
+                self.process_web_source(self.input_source, out)
+            else:
+                self.process_local_directory(self.input_source, out)
         
         end_time = datetime.now()
         elapsed = end_time - start_time
@@ -2,11 +2,11 @@
 # -*- coding: utf-8 -*-
 
 import streamlit as st
-import subprocess
-import sys
 import os
-import re
-from pathlib import Path
+import threading
+import time
+
+from aggregate_files import FileAggregator
 
 
 def main():
@@ -83,62 +83,56 @@ def main():
         # プログレスバーとステータス表示
         progress_bar = st.progress(0)
         status_text = st.empty()
-        
+
         # 進捗情報表示
         progress_info = st.empty()
-        
-        # ログ表示エリア
-        log_container = st.container()
-        
+
         try:
-            # コマンド構築
-            command = [sys.executable, "aggregate_files.py", input_source, output_file]
-            
-            # 実行開始
+            # サブプロセスを起動してstdoutを解析する代わりに、集約処理を
+            # インプロセスで実行する。インタープリター起動コストが無くなり、
+            # 進捗もコールバック経由で構造化された値として受け取れる
+            progress_state = {'percent': 0.0, 'current_file': '',
+                              'eta': '', 'error': None, 'done': False}
+
+            def on_progress(percent, current_file, eta_str):
+                # ワーカースレッドから呼ばれる。単純な代入のみ行い、
+                # Streamlitの描画はメインスレッド側のポーリングに任せる
+                progress_state['percent'] = percent
+                progress_state['current_file'] = current_file
+                progress_state['eta'] = eta_str
+
+            def run_aggregation():
+                try:
+                    aggregator = FileAggregator(input_source, output_file,
+                                                progress_callback=on_progress)
+                    aggregator.aggregate()
+                except Exception as e:
+                    progress_state['error'] = str(e)
+                finally:
+                    progress_state['done'] = True
+
+            # 実行開始（バックグラウンドスレッドで集約を回し、
+            # メインスレッドは進捗表示を更新する）
             status_text.text("実行中...")
-            progress_bar.progress(10)
-            
-            # サブプロセス実行
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1
-            )
-            
-            progress_bar.progress(30)
-            
-            # リアルタイムログ表示と進捗解析
-            log_output = ""
-            with log_container:
-                log_placeholder = st.empty()
-                
-                for line in process.stdout:
-                    log_output += line
-                    log_placeholder.code(log_output, language="text")
-                    
-                    # 進捗情報を解析して表示
-                    if "進捗:" in line:
-                        # 進捗バーを更新
-                        progress_match = re.search(r'進捗: (\d+\.?\d*)%', line)
-                        if progress_match:
-                            progress_percent = float(progress_match.group(1)) / 100
-                            progress_bar.progress(progress_percent)
-                        
-                        # 進捗情報を表示
-                        progress_info.text(line.strip())
-            
-            # プロセス完了待機
-            return_code = process.wait()
-            progress_bar.progress(90)
-            
-            if return_code == 0:
+            worker = threading.Thread(target=run_aggregation, daemon=True)
+            worker.start()
+
+            while not progress_state['done']:
+                progress_bar.progress(min(progress_state['percent'], 100.0) / 100)
+                if progress_state['current_file']:
+                    progress_info.text(
+                        f"進捗: {progress_state['percent']:.1f}% "
+                        f"現在処理中: {progress_state['current_file']} "
+                        f"完了予定時刻: {progress_state['eta']}")
+                time.sleep(0.1)
+            worker.join()
+
+            if progress_state['error'] is None:
                 progress_bar.progress(100)
                 status_text.text("完了!")
                 progress_info.text("処理が正常に完了しました。")
                 st.success(f"集約処理が正常に完了しました。出力ファイル: {output_file}")
-                
+
                 # 出力ファイルへのリンク
                 if os.path.exists(output_file):
                     st.info("出力ファイルをダウンロード:")
@@ -150,13 +144,8 @@ def main():
                             mime="text/markdown"
                         )
             else:
-                st.error(f"エラーが発生しました。リターンコード: {return_code}")
-                if log_output:
-                    st.error("エラーログ:")
-                    st.code(log_output, language="text")
-        
-        except FileNotFoundError:
-            st.error("aggregate_files.pyが見つかりません。同じディレクトリに存在することを確認してください。")
+                st.error(f"エラーが発生しました: {progress_state['error']}")
+
         except Exception as e:
             st.error(f"予期せぬエラーが発生しました: {str(e)}")
     